@@ -1,7 +1,11 @@
+from collections import defaultdict
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict, List, Literal, Optional, Iterable, Union
+from typing import Callable, DefaultDict, Dict, List, Literal, Optional, Iterable, Sequence, Tuple, Union
+import functools
+import itertools
 import numpy.typing as npt
+import numpy as np
 import gmsh
 from .importers import import_from_gmsh
 
@@ -13,75 +17,215 @@ class DimType(Enum):
     VOLUME = 3
 
 
+POINT_TOLERANCE = 1e-9
+"absolute distance below which points are considered coincident"
+
+_CURVE_DIM = DimType.CURVE.value
+_SURFACE_DIM = DimType.SURFACE.value
+_add_physical_group = gmsh.model.add_physical_group
+_set_physical_name = gmsh.model.set_physical_name
+
+
+def _once_before(before_sync):
+    "runs before_sync only on first call and marks transaction as before sync initiated"
+    @functools.wraps(before_sync)
+    def wrapper(self, *args, **kwargs):
+        if not self.before_sync_initiated:
+            before_sync(self, *args, **kwargs)
+            self.before_sync_initiated = True
+    return wrapper
+
+
+def _once_after(after_sync):
+    "runs after_sync only on first call and marks transaction as after sync initiated"
+    @functools.wraps(after_sync)
+    def wrapper(self, *args, **kwargs):
+        if not self.after_sync_initiated:
+            after_sync(self, *args, **kwargs)
+            self.after_sync_initiated = True
+    return wrapper
+
+
 class MeshTransaction:
+    __slots__ = ("tag", "before_sync_initiated", "after_sync_initiated")
+
     def __init__(self) -> None:
         self.tag: Optional[int] = None
         self.before_sync_initiated: bool = False
         self.after_sync_initiated: bool = False
 
+    @_once_before
     def before_sync(self):
         "completes transaction before syncronization and returns tag."
-        self.before_sync_initiated = True
 
+    @_once_after
     def after_sync(self):
         "completes transaction after syncronization and returns tag."
-        self.after_sync_initiated = True
+
+    def dependencies(self) -> List["MeshTransaction"]:
+        "transactions that have to be synced before this one."
+        return []
 
 class Field(MeshTransaction):
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__()
 
+    @_once_before
     def before_sync(self, curve_loop: "CurveLoop"):
-        super().before_sync()
+        pass
 
+    @_once_after
     def after_sync(self, curve_loop: "CurveLoop"):
-        super().after_sync()
+        pass
 
 
 
-@dataclass
+@dataclass(slots=True)
 class Point(MeshTransaction):
-    coord: npt.NDArray
-    "coordinate of point"
+    coord: Union[npt.NDArray, Sequence[float]]
+    "coordinate of point, tuples and lists are used as is without converting to an array"
     mesh_size: float
     "mesh size for point"
 
+    dim_type: DimType = field(init=False, repr=False, compare=False)
+
+    # slots=True dataclasses are recreated, so zero argument super() can't be used in them
     def __post_init__(self):
-        super().__init__()
+        MeshTransaction.__init__(self)
         self.dim_type = DimType.POINT
-        self.x = self.coord[0]
-        self.y = self.coord[1]
-        self.z = self.coord[2] if len(self.coord) == 3 else 0
 
+    # read through to coord, so points made by PointSoA.view follow the shared coords array
+    @property
+    def x(self) -> float:
+        return float(self.coord[0])
+
+    @property
+    def y(self) -> float:
+        return float(self.coord[1])
+
+    @property
+    def z(self) -> float:
+        return float(self.coord[2]) if len(self.coord) == 3 else 0.0
+
+    @property
+    def xyz(self) -> Tuple[float, float, float]:
+        "x, y and z converted in one pass instead of one indexing per coordinate"
+        coord = np.asarray(self.coord, dtype=np.float64).tolist()
+        return (coord[0], coord[1], coord[2] if len(coord) == 3 else 0.0)
+
+    @_once_before
     def before_sync(self):
-        if not self.before_sync_initiated:
-            self.tag = gmsh.model.geo.add_point(self.x, self.y, self.z, self.mesh_size)
-        super().before_sync()
+        self.tag = gmsh.model.geo.add_point(*self.xyz, self.mesh_size)
 
 
-@dataclass
+@dataclass(slots=True)
 class Line(MeshTransaction):
     start: Point
     "starting point of line"
     end: Point
     "ending point of line"
 
+    dim_type: DimType = field(init=False, repr=False, compare=False)
+
     def __post_init__(self):
         self.dim_type = DimType.CURVE
-        super().__init__()
+        MeshTransaction.__init__(self)
 
+    @_once_before
     def before_sync(self):
-        if not self.before_sync_initiated:
-            self.start.before_sync()
-            self.end.before_sync()
-            self.tag = gmsh.model.geo.add_line(self.start.tag, self.end.tag)
-        super().before_sync()
+        self.start.before_sync()
+        self.end.before_sync()
+        self.tag = gmsh.model.geo.add_line(self.start.tag, self.end.tag)
+
+    def dependencies(self) -> List[MeshTransaction]:
+        return [self.start, self.end]
+
+
+def _index_getter(items: List[MeshTransaction], name: str):
+    "returns function that maps an item or its index to its index in items."
+    indices: Optional[Dict[int, Tuple[MeshTransaction, int]]] = None
+
+    def get_index(item: Union[MeshTransaction, int]) -> int:
+        nonlocal indices
+        if isinstance(item, MeshTransaction):
+            # built on first lookup by object, entries keep the items alive so their ids can't be reused
+            if indices is None:
+                indices = {id(item): (item, i) for i, item in enumerate(items)}
+            entry = indices.get(id(item))
+            if entry is None or entry[0] is not item:
+                raise ValueError(f"{name} is not part of this curve loop")
+            return entry[1]
+        return item
+    return get_index
+
+
+def _broadcast(value: Union[float, List[float]], n: int) -> List[float]:
+    "expands scalar value to list of length n, lists are checked for length n"
+    if isinstance(value, (list, tuple, np.ndarray)):
+        assert len(value) == n, f"expected {n} values, got {len(value)}"
+        return list(value)
+    return [value] * n
+
+
+@dataclass(slots=True)
+class PointSoA:
+    "structure of arrays storage for points of a curve loop"
+
+    coords: npt.NDArray[np.float64]
+    "(N, 3) array of point coordinates, updating in place (coords[:] = coords @ R.T) moves the points, except those merged into another curve loop's points by Geometry"
+
+    mesh_sizes: npt.NDArray[np.float64]
+    "mesh size for each point"
+
+    def view(self, i: int):
+        "point for index i, coord is a view into coords"
+        return Point(self.coords[i], self.mesh_sizes[i])
+
+
+def get_points_and_lines(
+    coords: npt.NDArray,
+    mesh_size: Union[float, List[float]],
+    tolerance: float = POINT_TOLERANCE
+):
+    "generates closed loop of points and lines from coordinates"
+    coords = np.asarray(coords, dtype=np.float64)
+    mesh_sizes = np.asarray(_broadcast(mesh_size, len(coords)), dtype=np.float64)
+
+    # already closed coordinates would give a zero length closing line, the first point closes the loop instead
+    if len(coords) > 1 and np.allclose(coords[0], coords[-1], rtol=0, atol=tolerance):
+        coords, mesh_sizes = coords[:-1], mesh_sizes[:-1]
+
+    num_points = len(coords)
+    point_coords = np.zeros((num_points, 3), dtype=np.float64)
+    point_coords[:, :coords.shape[1]] = coords
+    soa = PointSoA(point_coords, mesh_sizes)
+
+    points = [soa.view(i) for i in range(num_points)]
+    lines = [Line(start, end) for (start, end) in zip(points, points[1:] + points[:1])]
+    return soa, points, lines
+
+
+def get_line_cell_counts(
+    num_lines: int,
+    line_index: Callable[[Union[Line, int]], int],
+    transfinite_cell_counts: Dict[float, Union[List[Union[Line, int]], Literal["all"]]]
+):
+    "resolves transfinite cell counts to an array with cell count per line, -1 if line is not transfinite"
+    cell_counts = np.full(num_lines, -1, dtype=np.int32)
+    for (cell_count, transfinite_lines) in transfinite_cell_counts.items():
+        if transfinite_lines == "all":
+            cell_counts[:] = cell_count
+        else:
+            cell_counts[[line_index(line) for line in transfinite_lines]] = cell_count
+    return cell_counts
 
 
-@dataclass
+@dataclass(slots=True)
 class CurveLoop(MeshTransaction):
     coords: npt.NDArray
-    "2D array of coordinate points"
+    "2D array of coordinate points, if the last coordinate repeats the first it is dropped"
 
     mesh_size: Union[float, List[float]]
     "Mesh size for points, If list, must be same length as coords."
@@ -95,72 +239,115 @@ class CurveLoop(MeshTransaction):
     transfinite_cell_counts: Optional[Dict[float, Union[List[Union[Line, int]], Literal["all"]]]] = None
     "mesh size for lines in surface"
 
-    def __post_init__(self):
-        super().__init__()
-        self.dim_type = DimType.CURVE
-        self.line_tags: List[int] = []
+    dim_type: DimType = field(init=False, repr=False, compare=False)
+    line_tags: npt.NDArray[np.int32] = field(init=False, repr=False, compare=False)
+    point_soa: PointSoA = field(init=False, repr=False, compare=False)
+    points: List[Point] = field(init=False, repr=False, compare=False)
+    lines: List[Line] = field(init=False, repr=False, compare=False)
 
-        if isinstance(self.mesh_size, List):
-            assert len(self.mesh_size) == len(self.points)
+    line_orientations: npt.NDArray[np.int32] = field(init=False, repr=False, compare=False)
+    "1 if line runs along the loop, -1 if it is a reversed line shared with another curve loop"
 
-        self.points: List[Point] = []
-        self.lines: List[Line] = []
+    merged_point_indices: List[int] = field(init=False, repr=False, compare=False)
+    "indices of points replaced by Geometry with points of other curve loops"
 
-        for i, coord in enumerate(self.coords):
-            # getting mesh size for point
-            mesh_size = self.mesh_size[i] if isinstance(self.mesh_size, List) else self.mesh_size
+    point_index: Callable[[Union[Point, int]], int] = field(init=False, repr=False, compare=False)
+    "maps point or point index to index in points"
 
-            # adding points
-            self.points.append(Point(coord, mesh_size))
+    line_index: Callable[[Union[Line, int]], int] = field(init=False, repr=False, compare=False)
+    "maps line or line index to index in lines"
 
-            # adding lines to connect points
-            if i > 0:
-                self.lines.append(Line(self.points[i-1], self.points[i]))
-            if i == len(self.coords) - 1:
-                self.lines.append(Line(self.points[i], self.points[0]))
+    _label_line_indices: Dict[str, List[int]] = field(init=False, repr=False, compare=False)
+    _transfinite_line_indices: npt.NDArray[np.intp] = field(init=False, repr=False, compare=False)
+    _transfinite_node_counts: npt.NDArray[np.int32] = field(init=False, repr=False, compare=False)
 
+    def __post_init__(self):
+        MeshTransaction.__init__(self)
+        self.dim_type = DimType.CURVE
+        self.line_tags = np.empty(0, dtype=np.int32)
+        self.point_soa, self.points, self.lines = get_points_and_lines(self.coords, self.mesh_size)
+        self.line_orientations = np.ones(len(self.lines), dtype=np.int32)
+        self.merged_point_indices = []
+        self.point_index = _index_getter(self.points, "point")
+        self.line_index = _index_getter(self.lines, "line")
+        # labels can be given as any iterable, so one shot iterators are read once here
+        self.labels = {
+            name: label_lines if label_lines == "all" else list(label_lines)
+            for (name, label_lines) in self.labels.items()
+        }
+
+    def get_line_from_start(self, point: Union[Point, int]):
+        "line leaving point or point index in loop order, runs into point instead if its line_orientations entry is -1"
+        # lines[i] always follows points[i], so point_index gives the line index
+        return self.lines[self.point_index(point)]
+
+    def resolve(self):
+        "resolves label and transfinite line indices, called once by Geometry before any gmsh calls."
+        num_lines = len(self.lines)
+        self._label_line_indices = {
+            name: list(range(num_lines)) if label_lines == "all"
+            else [self.line_index(label_line) for label_line in label_lines]
+            for (name, label_lines) in self.labels.items()
+        }
+        cell_counts = get_line_cell_counts(num_lines, self.line_index, self.transfinite_cell_counts or {})
+        self._transfinite_line_indices = np.flatnonzero(cell_counts >= 0)
+        self._transfinite_node_counts = cell_counts[self._transfinite_line_indices] + 1
+
+    @_once_before
     def before_sync(self):
-        if not self.before_sync_initiated:
-            for line in self.lines:
-                line.before_sync()
-                assert line.tag is not None
-                self.line_tags.append(line.tag)
-            self.tag = gmsh.model.geo.add_curve_loop(self.line_tags)
-            for field in self.fields:
-                field.before_sync(self)
+        # add all points in one pass so the lines below only add gmsh lines,
+        # coordinates are read in bulk except for merged points, which belong to another loop
+        coords = self.point_soa.coords.tolist()
+        mesh_sizes = self.point_soa.mesh_sizes.tolist()
+        for i in self.merged_point_indices:
+            point = self.points[i]
+            coords[i], mesh_sizes[i] = point.xyz, point.mesh_size
+
+        add_point = gmsh.model.geo.add_point
+        for (point, (x, y, z), mesh_size) in zip(self.points, coords, mesh_sizes):
+            if not point.before_sync_initiated:
+                point.tag = add_point(x, y, z, mesh_size)
+                point.before_sync_initiated = True
+
+        # points are all added above, so lines are added inline instead of through Line.before_sync,
+        # contiguous int32 buffer is passed to gmsh without converting each tag
+        add_line = gmsh.model.geo.add_line
+        self.line_tags = np.empty(len(self.lines), dtype=np.int32)
+        for i, line in enumerate(self.lines):
+            if not line.before_sync_initiated:
+                line.tag = add_line(line.start.tag, line.end.tag)
+                line.before_sync_initiated = True
+            self.line_tags[i] = line.tag
+        self.tag = gmsh.model.geo.add_curve_loop(self.line_tags * self.line_orientations)
+        for field in self.fields:
+            field.before_sync(self)
+
+    def dependencies(self) -> List[MeshTransaction]:
+        "points and lines are synced in batch by before_sync."
+        return []
 
-        super().before_sync()
+    def get_label_line_tags(self) -> Dict[str, List[int]]:
+        "line tags for each label, physical groups are added by Geometry across all curve loops."
+        line_tags = self.line_tags
+        return {
+            name: line_tags[line_indices].tolist()
+            for (name, line_indices) in self._label_line_indices.items()
+        }
 
+    @_once_after
     def after_sync(self):
-        if not self.after_sync_initiated and self.labels:
-            for (name, label_lines) in self.labels.items():
-                if label_lines == "all":
-                    label_line_tags = self.line_tags
-                else:
-                    label_line_tags = [
-                        label_line.tag if isinstance(label_line, Line)
-                        else self.lines[label_line].tag
-                        for label_line in label_lines
-                    ]
-                physical_group_tag = gmsh.model.add_physical_group(DimType.CURVE.value, label_line_tags)
-                gmsh.model.set_physical_name(DimType.CURVE.value, physical_group_tag, name)
-        
         for field in self.fields:
             field.after_sync(self)
 
-        if self.transfinite_cell_counts is not None:
-            for (cell_count, transfinite_lines) in self.transfinite_cell_counts.items():
-                for line in (self.lines if transfinite_lines == "all" else transfinite_lines):
-                    gmsh.model.mesh.set_transfinite_curve(
-                        line.tag if isinstance(line, Line)
-                        else self.lines[line].tag,
-                        cell_count+1
-                    )
-
-        super().after_sync()
+        if len(self._transfinite_line_indices):
+            # gmsh has no batched call, so loop over plain ints with the api call bound once
+            set_transfinite_curve = gmsh.model.mesh.set_transfinite_curve
+            line_tags = self.line_tags[self._transfinite_line_indices]
+            for (line_tag, node_count) in zip(line_tags.tolist(), self._transfinite_node_counts.tolist()):
+                set_transfinite_curve(line_tag, node_count)
 
 
-@dataclass
+@dataclass(slots=True)
 class PlaneSurface(MeshTransaction):
     outline: CurveLoop
     "outline curve loop that make up the surface"
@@ -177,43 +364,61 @@ class PlaneSurface(MeshTransaction):
     transfinite_corners: Optional[List[Union[Point, int]]] = None
     "corners of transfinite surface"
 
+    dim_type: DimType = field(init=False, repr=False, compare=False)
+
     def __post_init__(self):
-        super().__init__()
+        MeshTransaction.__init__(self)
         self.dim_type = DimType.SURFACE
-        self.curve_loops = [self.outline] + self.holes
 
+    @property
+    def curve_loops(self) -> List[CurveLoop]:
+        "outline followed by holes"
+        return list(itertools.chain((self.outline,), self.holes))
+
+    @_once_before
     def before_sync(self):
-        if not self.before_sync_initiated:
-            curve_loop_tags = []
-            for curve_loop in self.curve_loops:
-                curve_loop.before_sync()
-                curve_loop_tags.append(curve_loop.tag)
-            self.tag = gmsh.model.geo.add_plane_surface(curve_loop_tags)
+        curve_loop_tags = np.empty(1 + len(self.holes), dtype=np.int32)
+        for i, curve_loop in enumerate(itertools.chain((self.outline,), self.holes)):
+            curve_loop.before_sync()
+            curve_loop_tags[i] = curve_loop.tag
+        self.tag = gmsh.model.geo.add_plane_surface(curve_loop_tags)
 
-        super().before_sync()
+    def dependencies(self) -> List[MeshTransaction]:
+        return self.curve_loops
 
+    @_once_after
     def after_sync(self):
-        if not self.after_sync_initiated:
-            for curve_loop in self.curve_loops:
-                curve_loop.after_sync()
-            if self.label is not None:
-                physical_group_tag = gmsh.model.add_physical_group(DimType.SURFACE.value, [self.tag])
-                gmsh.model.set_physical_name(DimType.SURFACE.value, physical_group_tag, self.label)
+        for curve_loop in itertools.chain((self.outline,), self.holes):
+            curve_loop.after_sync()
+        if self.label is not None:
+            physical_group_tag = _add_physical_group(_SURFACE_DIM, [self.tag])
+            _set_physical_name(_SURFACE_DIM, physical_group_tag, self.label)
 
         if self.transfinite_corners is not None:
-            corner_tags = [
-                corner.tag if isinstance(corner, Point)
-                else self.outline.points[corner].tag
-                for corner in self.transfinite_corners
-            ]
+            point_index = self.outline.point_index
+            corner_tags = np.array(
+                [self.outline.points[point_index(corner)].tag for corner in self.transfinite_corners],
+                dtype=np.int32
+            )
             gmsh.model.mesh.set_transfinite_surface(self.tag, cornerTags=corner_tags)
             
             if self.is_quad_mesh: 
-                gmsh.model.mesh.set_recombine(2, self.tag)  # type: ignore
-        super().after_sync()
+                gmsh.model.mesh.set_recombine(_SURFACE_DIM, self.tag)  # type: ignore
 
 
-@dataclass
+# (attribute, gmsh field option, cast) for each optional BoundaryLayer setting
+_BOUNDARY_LAYER_OPTIONS = (
+    ("aniso_max", "AnisoMax", float),
+    ("intersect_metrics", "IntersectMetrics", float),
+    ("is_quad_mesh", "Quads", int),
+    ("hfar", "hfar", float),
+    ("hwall_n", "hwall_n", float),
+    ("ratio", "ratio", float),
+    ("thickness", "thickness", float),
+)
+
+
+@dataclass(slots=True)
 class BoundaryLayer(Field):
     aniso_max: Optional[float] = None
     "threshold angle for creating a mesh fan in the boundary layer"
@@ -238,34 +443,105 @@ class BoundaryLayer(Field):
 
 
     def __post_init__(self):
-        super().__init__()
+        Field.__init__(self)
 
+    @_once_after
     def after_sync(self, curve_loop: CurveLoop):
-        if not self.after_sync_initiated:
-            self.tag = gmsh.model.mesh.field.add('BoundaryLayer')
-            gmsh.model.mesh.field.setNumbers(self.tag, 'CurvesList', curve_loop.line_tags)
-            if self.aniso_max:
-                gmsh.model.mesh.field.setNumber(self.tag, "AnisoMax", self.aniso_max)
-            if self.intersect_metrics:
-                gmsh.model.mesh.field.setNumber(self.tag, "IntersectMetrics", self.intersect_metrics)
-            if self.is_quad_mesh:
-                gmsh.model.mesh.field.setNumber(self.tag, "Quads", int(self.is_quad_mesh))
-            if self.hfar:
-                gmsh.model.mesh.field.setNumber(self.tag, "hfar", self.hfar)
-            if self.hwall_n:
-                gmsh.model.mesh.field.setNumber(self.tag, "hwall_n", self.hwall_n)
-            if self.ratio:
-                gmsh.model.mesh.field.setNumber(self.tag, "ratio", self.ratio)
-            if self.thickness:
-                gmsh.model.mesh.field.setNumber(self.tag, "thickness", self.thickness)
+        self.tag = gmsh.model.mesh.field.add('BoundaryLayer')
+        gmsh.model.mesh.field.setNumbers(self.tag, 'CurvesList', curve_loop.line_tags)
+        set_number = gmsh.model.mesh.field.setNumber
+        for (attr, option, cast) in _BOUNDARY_LAYER_OPTIONS:
+            value = getattr(self, attr)
+            if value:
+                set_number(self.tag, option, cast(value))
 
-            gmsh.model.mesh.field.setAsBoundaryLayer(self.tag)
-        super().after_sync(curve_loop)
+        gmsh.model.mesh.field.setAsBoundaryLayer(self.tag)
 
 
 
 
 class Geometry:
+    def __init__(self, point_tolerance: float = POINT_TOLERANCE) -> None:
+        """
+        Points of different curve loops closer than point_tolerance with the same mesh size are merged,
+        and lines between merged points are shared, reversed if needed, so neighbouring surfaces conform.
+        Coincident points in the same curve loop are not merged.
+        """
+        self.point_tolerance = point_tolerance
+        self._point_cache: Dict[Tuple[int, int, int, int], Point] = {}
+        self._line_cache: Dict[Tuple[int, int], Line] = {}
+        # curve loops are added to the caches only once a later lookup needs them
+        self._unregistered: List[Tuple[CurveLoop, Optional[List[Tuple[int, int, int, int]]]]] = []
+        self._curve_loops: List[CurveLoop] = []
+        self._pre: List[Callable[[], None]] = []
+        self._post: List[Callable[[], None]] = []
+
+    def _point_keys(self, coords: npt.NDArray, mesh_sizes: npt.NDArray) -> List[Tuple[int, int, int, int]]:
+        "cache keys for (N, 3) coords and their mesh sizes, rounded in bulk"
+        values = np.column_stack((coords, mesh_sizes)) / self.point_tolerance
+        return list(map(tuple, np.round(values).astype(np.int64).tolist()))
+
+    def _curve_loop_keys(self, curve_loop: CurveLoop):
+        point_soa = curve_loop.point_soa
+        return self._point_keys(point_soa.coords, point_soa.mesh_sizes)
+
+    def _register_curve_loops(self):
+        "adds points and lines of merged curve loops to the caches"
+        point_cache, line_cache = self._point_cache, self._line_cache
+        for (curve_loop, keys) in self._unregistered:
+            point_cache.update(zip(keys or self._curve_loop_keys(curve_loop), curve_loop.points))
+            line_cache.update(((id(line.start), id(line.end)), line) for line in curve_loop.lines)
+        self._unregistered.clear()
+
+    def make_point(self, coord: npt.NDArray, mesh_size: float):
+        "returns existing point for coordinate and mesh size, otherwise creates one"
+        self._register_curve_loops()
+        point = Point(coord, mesh_size)
+        (key,) = self._point_keys(np.array([point.xyz]), np.array([mesh_size]))
+        return self._point_cache.setdefault(key, point)
+
+    def _merge_points(self, curve_loop: CurveLoop):
+        "replaces points and lines of curve loop with those of previous curve loops at the same location"
+        self._register_curve_loops()
+        point_cache, line_cache = self._point_cache, self._line_cache
+        if not point_cache and not line_cache:
+            self._unregistered.append((curve_loop, None))
+            return
+
+        # only merge with other curve loops, coincident points in the same loop stay separate
+        keys = self._curve_loop_keys(curve_loop)
+        merged_indices = curve_loop.merged_point_indices = [i for (i, key) in enumerate(keys) if key in point_cache]
+        if merged_indices:
+            # new lists, so point_index and line_index keep resolving the loop's own points and lines
+            points = curve_loop.points = list(curve_loop.points)
+            lines = curve_loop.lines = list(curve_loop.lines)
+
+            # lines[i] runs from points[i] to points[i + 1], so only the two lines at a merged point change
+            touched_lines = set()
+            for i in merged_indices:
+                point, merged_point = points[i], point_cache[keys[i]]
+                points[i] = merged_point
+                for j in (i - 1, i):
+                    line = lines[j]
+                    if line.start is point:
+                        line.start = merged_point
+                    if line.end is point:
+                        line.end = merged_point
+                    touched_lines.add(j % len(lines))
+
+            for j in sorted(touched_lines):
+                line = lines[j]
+                # cached lines hold their points, so the ids in the keys stay valid
+                shared_line = line_cache.get((id(line.start), id(line.end)))
+                if shared_line is not None:
+                    lines[j] = shared_line
+                else:
+                    shared_line = line_cache.get((id(line.end), id(line.start)))
+                    if shared_line is not None:
+                        lines[j] = shared_line
+                        curve_loop.line_orientations[j] = -1
+        self._unregistered.append((curve_loop, keys))
+
     def __enter__(self):
         gmsh.initialize()
         return self
@@ -273,18 +549,52 @@ class Geometry:
     def __exit__(self, exc_type, exc_val, exc_tb):
         gmsh.finalize()
 
+    def _compile(self, transactions: List[MeshTransaction]):
+        "flattens transaction tree into dependency ordered before and after sync calls"
+        ordered: List[MeshTransaction] = []
+        visited = set()
+
+        def visit(transaction: MeshTransaction):
+            if id(transaction) in visited:
+                return
+            visited.add(id(transaction))
+            for dependency in transaction.dependencies():
+                visit(dependency)
+            ordered.append(transaction)
+
+        for transaction in transactions:
+            visit(transaction)
+
+        self._curve_loops = [transaction for transaction in ordered if isinstance(transaction, CurveLoop)]
+
+        # python side preparation of all curve loops happens before the gmsh calls
+        for curve_loop in self._curve_loops:
+            curve_loop.resolve()
+            self._merge_points(curve_loop)
+
+        self._pre = [transaction.before_sync for transaction in ordered]
+        self._post = [transaction.after_sync for transaction in ordered]
+
+    def _add_line_groups(self):
+        "adds one physical group per label for the lines of all curve loops"
+        line_groups: DefaultDict[str, List[int]] = defaultdict(list)
+        for curve_loop in self._curve_loops:
+            for (name, label_line_tags) in curve_loop.get_label_line_tags().items():
+                line_groups[name] += label_line_tags
+
+        for (name, label_line_tags) in line_groups.items():
+            # lines shared between curve loops can be labeled by both
+            physical_group_tag = _add_physical_group(_CURVE_DIM, list(dict.fromkeys(label_line_tags)))
+            _set_physical_name(_CURVE_DIM, physical_group_tag, name)
+
     def generate(self, transactions: Union[MeshTransaction, List[MeshTransaction]]):
-        if isinstance(transactions, list):
-            for transaction in transactions:
-                transaction.before_sync()
-        else:
-            transactions.before_sync()
+        self._compile(transactions if isinstance(transactions, list) else [transactions])
+        for before_sync in self._pre:
+            before_sync()
         gmsh.model.geo.synchronize()
-        if isinstance(transactions, list):
-            for transaction in transactions:
-                transaction.after_sync()
-        else:
-            transactions.after_sync()
+        for after_sync in self._post:
+            after_sync()
+        self._add_line_groups()
         gmsh.model.mesh.generate()
         gmsh.option.set_number("Mesh.SaveAll", 1)
         return import_from_gmsh(gmsh.model)
@@ -9,6 +9,7 @@ setup(
    author='Afshawn Lotfi',
    author_email='',
    packages=['ezmesh', 'ezmesh.utils'],
+   python_requires='>=3.10',
    install_requires=[
     "numpy",
     "gmsh",
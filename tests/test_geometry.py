@@ -0,0 +1,26 @@
+import gmsh
+import numpy as np
+from ezmesh import Geometry, CurveLoop, PlaneSurface
+
+
+def test_shared_edge_is_merged():
+    left = CurveLoop(np.array([[0, 0], [1, 0], [1, 1], [0, 1]]), mesh_size=0.5, labels={"wall": "all"})
+    right = CurveLoop(np.array([[1, 0], [2, 0], [2, 1], [1, 1]]), mesh_size=0.5, labels={"wall": "all"})
+
+    with Geometry() as geometry:
+        gmsh.option.set_number("General.Terminal", 0)
+        geometry.generate([PlaneSurface(left), PlaneSurface(right)])
+
+        assert right.points[0] is left.points[1]
+        assert right.points[3] is left.points[2]
+        assert right.lines[3] is left.lines[1]
+        assert right.line_orientations.tolist() == [1, 1, 1, -1]
+
+        assert len(gmsh.model.get_entities(0)) == 6
+        assert len(gmsh.model.get_entities(1)) == 7
+
+        physical_groups = gmsh.model.get_physical_groups(1)
+        assert len(physical_groups) == 1
+        wall_lines = gmsh.model.get_entities_for_physical_group(*physical_groups[0])
+        assert sorted(wall_lines.tolist()) == sorted(tag for (_, tag) in gmsh.model.get_entities(1))
+